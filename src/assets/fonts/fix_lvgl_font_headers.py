@@ -1,29 +1,42 @@
 
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+
+# Pattern matches both "lvgl.h" and <lvgl.h> variants
+_HEADER_RE = re.compile(
+    r'#ifdef LV_LVGL_H_INCLUDE_SIMPLE\s*#include [<"]lvgl\.h[>"]\s*#else\s*#include [<"]lvgl(?:/lvgl)?\.h[>"]\s*#endif',
+    re.MULTILINE
+)
 
 def fix_lvgl_header_in_file(filepath):
-    with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
+    """Rewrite the LVGL include guard in filepath; returns (filepath, fixed)."""
+    with open(filepath, 'rb') as f:
+        raw = f.read()
 
-    # Pattern matches both "lvgl.h" and <lvgl.h> variants
-    pattern = re.compile(
-        r'#ifdef LV_LVGL_H_INCLUDE_SIMPLE\s*#include [<"]lvgl\.h[>"]\s*#else\s*#include [<"]lvgl(?:/lvgl)?\.h[>"]\s*#endif',
-        re.MULTILINE
-    )
+    # Already-fixed files skip the decode and regex entirely
+    if b'LV_LVGL_H_INCLUDE_SIMPLE' not in raw:
+        return filepath, False
 
-    new_content, count = pattern.subn('#include <lvgl.h>', content)
+    content = raw.decode('utf-8')
+    new_content, count = _HEADER_RE.subn('#include <lvgl.h>', content)
     if count > 0:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        print(f"Fixed header in: {filepath}")
-    else:
-        print(f"No change needed: {filepath}")
+        with open(filepath, 'wb') as f:
+            f.write(new_content.encode('utf-8'))
+    return filepath, count > 0
 
 def fix_all_font_headers(directory):
-    for filename in os.listdir(directory):
-        if filename.endswith('.c'):
-            fix_lvgl_header_in_file(os.path.join(directory, filename))
+    with os.scandir(directory) as it:
+        paths = [entry.path for entry in it if entry.is_file() and entry.name.endswith('.c')]
+    # Files are independent and the work is I/O bound, so threads overlap the reads/writes
+    workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        # Report from this thread, in paths order; draining also re-raises worker errors
+        for filepath, fixed in ex.map(fix_lvgl_header_in_file, paths):
+            if fixed:
+                print(f"Fixed header in: {filepath}")
+            else:
+                print(f"No change needed: {filepath}")
 
 if __name__ == "__main__":
     # Change this to your fonts directory if needed
@@ -22,12 +22,13 @@ MERGE MODE:
 """
 
 import argparse
+import atexit
 import csv
 import datetime as dt
 import os
 import re
 import sys
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Dict, Any, Optional, Iterable, Iterator, Union
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Optional GUI (tkinter)
@@ -42,34 +43,42 @@ def _try_import_tk():
 
 TK, FILEDIALOG, MSGBOX = _try_import_tk()
 
+_TK_ROOT = None
+
+def _get_root():
+    """Hidden Tk root shared by all dialogs; created on first use, destroyed at exit."""
+    global _TK_ROOT
+    if _TK_ROOT is None:
+        _TK_ROOT = TK.Tk()
+        _TK_ROOT.withdraw()
+        _TK_ROOT.update_idletasks()
+        atexit.register(_TK_ROOT.destroy)
+    return _TK_ROOT
+
 # Start in the folder where you launched the script
 START_DIR = os.getcwd()
 
 def browse_open_csv(title="Select translations CSV", initial=None):
     if TK is None:
         return None
-    root = TK.Tk()
-    root.withdraw()
-    root.update_idletasks()
+    root = _get_root()
     path = FILEDIALOG.askopenfilename(
+        parent=root,
         title=title,
         initialdir=initial or START_DIR,
         filetypes=[("CSV", "*.csv"), ("All files", "*.*")]
     )
-    root.destroy()
     return path or None
 
 def browse_pick_folder(title="Select output folder", initial=None):
     if TK is None:
         return None
-    root = TK.Tk()
-    root.withdraw()
-    root.update_idletasks()
+    root = _get_root()
     path = FILEDIALOG.askdirectory(
+        parent=root,
         title=title,
         initialdir=initial or START_DIR
     )
-    root.destroy()
     return path or None
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -94,20 +103,29 @@ _LANG_SANITIZE = re.compile(r"[^A-Za-z0-9_]")
 
 def sanitize_lang_name(s: str) -> str:
     """Convert CSV header into a valid C identifier for struct fields."""
+    # Fast path: plain ASCII identifiers (en, de, lang_1, ...) are already valid
+    if s.isascii() and s.isidentifier():
+        return s
     s0 = s.strip().replace("-", "_").replace(" ", "_")
     s0 = _LANG_SANITIZE.sub("_", s0)
     if s0 and s0[0].isdigit():
         s0 = "_" + s0
     return s0 or "unnamed"
 
+_CXX_TRANS = str.maketrans({
+    "\\": "\\\\",
+    '"': '\\"',
+    "\t": "\\t",
+    "\n": "\\n",
+    "\r": "\\n",
+})
+
 def cxx_escape(s: str) -> str:
     """Escape for C++ string literal (UTF‑8)."""
-    if s is None:
+    if not s:
         return ""
-    s = s.replace("\\", "\\\\").replace('"', '\\"')
-    s = s.replace("\r\n", "\n").replace("\r", "\n").replace("\t", "\\t")
-    s = s.replace("\n", "\\n")
-    return s
+    # CRLF collapses to a single \n; lone CR / LF are handled by the table
+    return s.replace("\r\n", "\n").translate(_CXX_TRANS)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # CSV validation and in-memory model
@@ -134,7 +152,6 @@ def validate_and_build(rows: List[List[str]], sort_keys: bool) -> Tuple[List[str
 
     # Sanitize language names; ensure unique field names
     langs: List[str] = []
-    lang_map: Dict[str, str] = {}
     seen: set = set()
     for name in raw_langs:
         cname = sanitize_lang_name(name)
@@ -145,45 +162,48 @@ def validate_and_build(rows: List[List[str]], sort_keys: bool) -> Tuple[List[str
             cname = f"{base}_{i}"
         seen.add(cname)
         langs.append(cname)
-        lang_map[name] = cname
 
     # Build data
     data: List[Dict[str, Any]] = []
     key_seen: set = set()
-    dup_keys: List[str] = []
-    empty_count = {ln: 0 for ln in langs}
+    dup_keys: set = set()
+    # Empty-cell counters aligned with column index; folded into a dict below
+    empties = [0] * (1 + len(langs))
+    n_expected = 1 + len(raw_langs)
 
     for r in rows[1:]:
         if not r or not any(r):
             continue
         # pad short rows
-        if len(r) < (1 + len(raw_langs)):
-            r = r + [""] * ((1 + len(raw_langs)) - len(r))
+        if len(r) < n_expected:
+            r.extend([""] * (n_expected - len(r)))
 
         key = r[0].strip()
         if not key or key.startswith("#") or key.startswith("//"):
             continue
         if key in key_seen:
-            dup_keys.append(key)
+            dup_keys.add(key)
         key_seen.add(key)
 
         item = {"key": key}
-        for i, original in enumerate(raw_langs, start=1):
-            cname = lang_map[original]
-            val = r[i].strip() if i < len(r) else ""
+        # langs is positionally aligned with the CSV columns after 'key'
+        for i, cname in enumerate(langs, start=1):
+            val = r[i].strip()
             if not val:
-                empty_count[cname] += 1
+                empties[i] += 1
             item[cname] = val
         data.append(item)
 
     if sort_keys:
         data.sort(key=lambda d: d["key"])
 
+    empty_count = dict(zip(langs, empties[1:]))
+
     stats = {
         "rows": len(data),
         "langs": langs,
         "empty_per_lang": empty_count,
-        "duplicates": sorted(set(dup_keys)),
+        "duplicates": sorted(dup_keys),
         "sorted": sort_keys,
     }
     if dup_keys:
@@ -194,6 +214,68 @@ def validate_and_build(rows: List[List[str]], sort_keys: bool) -> Tuple[List[str
 # ─────────────────────────────────────────────────────────────────────────────
 # Existing (generated) header/cpp parsers for MERGE mode
 # ─────────────────────────────────────────────────────────────────────────────
+_ENTRY_STRUCT_RE = re.compile(r"struct\s+Entry\s*\{(.*?)\};", re.S)
+_LANG_FIELD_RE   = re.compile(r"const\s+char\*\s+([A-Za-z0-9_]+)\s*;")
+_TABLE_RE        = re.compile(r"const\s+Entry\s+D\s*\[\s*\]\s*=\s*\{(.*?)\};", re.S)
+_QUOTED_FIELD_RE = re.compile(r'"((?:\\.|[^"\\])*)"')
+_GENERATED_BANNER = "// Auto-generated from CSV"
+
+def _iter_rows(block: str) -> Iterator[str]:
+    """
+    Yield the text between each '{' and its closing '}' in an initializer block.
+    Quoted strings are skipped (honouring backslash escapes), so a brace inside
+    a translation does not end the row early.
+    """
+    find = block.find
+    start = find("{")
+    while start != -1:
+        i = start + 1
+        close = find("}", i)
+        while close != -1:
+            quote = find('"', i, close)
+            if quote == -1:
+                break
+            # Skip the string literal; a quote preceded by an odd run of
+            # backslashes is escaped and does not terminate it
+            i = quote + 1
+            while True:
+                q = find('"', i)
+                if q == -1:
+                    return
+                j = q
+                while block[j - 1] == "\\":
+                    j -= 1
+                i = q + 1
+                if (q - j) % 2 == 0:
+                    break
+            if close < i:
+                close = find("}", i)
+        if close == -1:
+            return
+        yield block[start + 1:close]
+        start = find("{", close + 1)
+
+def _split_generated_rows(block: str) -> Optional[List[str]]:
+    """
+    Fast path for tables written by iter_cpp: one '{ ... },' row per line.
+    Returns None when the block does not follow that layout, including lines
+    that hold more than one row (a brace outside the quoted fields).
+    """
+    rows: List[str] = []
+    for line in block.split("\n"):
+        t = line.strip()
+        if not t:
+            continue
+        if t[0] != "{" or not t.endswith(("},", "}")):
+            return None
+        body = t[1:t.rindex("}")]
+        if "{" in body or "}" in body:
+            rest = _QUOTED_FIELD_RE.sub("", body)
+            if "{" in rest or "}" in rest or '"' in rest:
+                return None
+        rows.append(body)
+    return rows
+
 def parse_existing_header(h_path: str) -> Optional[List[str]]:
     """
     Parse i18n_gen_export.h to extract language field names.
@@ -201,12 +283,13 @@ def parse_existing_header(h_path: str) -> Optional[List[str]]:
     """
     if not os.path.isfile(h_path):
         return None
-    txt = open(h_path, "r", encoding="utf-8").read()
-    m = re.search(r"struct\s+Entry\s*\{(.*?)\};", txt, re.S)
+    with open(h_path, "r", encoding="utf-8", buffering=1 << 20) as f:
+        txt = f.read()
+    m = _ENTRY_STRUCT_RE.search(txt)
     if not m:
         return None
     body = m.group(1)
-    langs = re.findall(r"const\s+char\*\s+([A-Za-z0-9_]+)\s*;", body)
+    langs = _LANG_FIELD_RE.findall(body)
     # First field is 'key'; discard it if present
     langs = [ln for ln in langs if ln != "key"]
     return langs or None
@@ -218,16 +301,21 @@ def parse_existing_table(cpp_path: str, langs: List[str]) -> Dict[str, Dict[str,
     """
     if not os.path.isfile(cpp_path):
         return {}
-    buf = open(cpp_path, "r", encoding="utf-8").read()
-    m = re.search(r"const\s+Entry\s+D\s*\[\s*\]\s*=\s*\{(.*?)\};", buf, re.S)
+    with open(cpp_path, "r", encoding="utf-8", buffering=1 << 20) as f:
+        buf = f.read()
+    m = _TABLE_RE.search(buf)
     if not m:
         return {}
     block = m.group(1)
-    rows = re.findall(r"\{(.*?)\}", block, re.S)
+    # Our own output can be split line by line; anything else goes through the scanner
+    generated = buf.find(_GENERATED_BANNER, 0, 256) != -1
+    rows = _split_generated_rows(block) if generated else None
+    if rows is None:
+        rows = _iter_rows(block)
     result: Dict[str, Dict[str, str]] = {}
     for r in rows:
         # Extract quoted fields with escape handling
-        fields = re.findall(r'"((?:\\.|[^"\\])*)"', r)
+        fields = _QUOTED_FIELD_RE.findall(r)
         if not fields:
             continue
         key = fields[0]
@@ -256,68 +344,72 @@ def merge_models(
     """
     # Union of languages: CSV first, then extras from existing
     merged_langs: List[str] = list(csv_langs)
+    seen = set(merged_langs)
     for ln in existing_langs:
-        if ln not in merged_langs:
+        if ln not in seen:
+            seen.add(ln)
             merged_langs.append(ln)
 
-    # Quick lookup for CSV rows
-    csv_map: Dict[str, Dict[str, str]] = {}
+    # Quick lookup for both sources; values are tuples aligned with merged_langs
+    csv_map: Dict[str, Tuple[str, ...]] = {}
     for row in csv_data:
-        csv_map[row["key"]] = {ln: row.get(ln, "") for ln in merged_langs}
+        csv_map[row["key"]] = tuple(row.get(ln, "") for ln in merged_langs)
+    ex_map: Dict[str, Tuple[str, ...]] = {}
+    for k, entry in existing_data.items():
+        ex_map[k] = tuple(entry.get(ln, "") for ln in merged_langs)
 
     # Counters
     added, updated, unchanged, orphan_kept, orphan_dropped = 0, 0, 0, 0, 0
 
-    # Desired order: CSV keys first (preserve order), then orphans (if kept)
-    keys_in_order: List[str] = preserve_order_keys[:] if preserve_order_keys else [r["key"] for r in csv_data]
-    for k in existing_data.keys():
-        if k not in csv_map:
-            if drop_orphans:
-                orphan_dropped += 1
-                continue
-            orphan_kept += 1
-            keys_in_order.append(k)
-
-    # Build merged rows
+    # Conflict policy is fixed for the whole call; pick(csv_val, ex_val) once
+    if overwrite_all and prefer == "csv":
+        pick = lambda c, e: c
+    elif overwrite_all:
+        pick = lambda c, e: e
+    elif prefer == "csv":
+        pick = lambda c, e: c if c != "" else e
+    else:  # prefer existing
+        pick = lambda c, e: e if e != "" else c
+
     merged_rows: List[Dict[str, Any]] = []
-    for k in keys_in_order:
+
+    def emit(k: str, vals: Tuple[str, ...]):
+        # Expand to the dict form the code generators consume
         merged_entry: Dict[str, Any] = {"key": k}
+        merged_entry.update(zip(merged_langs, vals))
+        merged_rows.append(merged_entry)
+
+    # CSV keys first (preserve order) ...
+    for k in (preserve_order_keys or [r["key"] for r in csv_data]):
         src_csv = csv_map.get(k)
-        src_ex  = existing_data.get(k)
+        if src_csv is None:
+            # Not a CSV key; existing-only keys are handled as orphans below
+            continue
+        src_ex = ex_map.get(k)
 
-        if src_csv and not src_ex:
+        if src_ex is None:
             # New key from CSV
-            for ln in merged_langs:
-                merged_entry[ln] = src_csv.get(ln, "")
+            emit(k, src_csv)
             added += 1
+            continue
 
-        elif src_ex and not src_csv:
-            # Orphan from existing
-            for ln in merged_langs:
-                merged_entry[ln] = src_ex.get(ln, "")
-            # orphan counters handled above
-
+        # Present in both → merge per policy
+        vals = tuple(map(pick, src_csv, src_ex))
+        if vals != src_ex:
+            updated += 1
         else:
-            # Present in both → merge per policy
-            changed = False
-            for ln in merged_langs:
-                csv_val = (src_csv or {}).get(ln, "")
-                ex_val  = (src_ex or {}).get(ln, "")
-                if overwrite_all:
-                    val = csv_val if prefer == "csv" else ex_val
-                elif prefer == "csv":
-                    val = csv_val if csv_val != "" else ex_val
-                else:  # prefer existing
-                    val = ex_val if ex_val != "" else csv_val
-                if val != ex_val:
-                    changed = True
-                merged_entry[ln] = val
-            if changed:
-                updated += 1
-            else:
-                unchanged += 1
+            unchanged += 1
+        emit(k, vals)
 
-        merged_rows.append(merged_entry)
+    # ... then orphans from existing (if kept)
+    for k, src_ex in ex_map.items():
+        if k in csv_map:
+            continue
+        if drop_orphans:
+            orphan_dropped += 1
+            continue
+        orphan_kept += 1
+        emit(k, src_ex)
 
     counters = {
         "added": added,
@@ -348,49 +440,48 @@ extern "C" {{
 }}
 """
 
-def generate_cpp(langs: List[str], data: List[Dict[str, Any]]) -> str:
-    lines = []
-    lines.append('// Auto-generated from CSV — DO NOT EDIT MANUALLY')
-    lines.append('#include "i18n.h"')
-    lines.append('#include "i18n_gen_export.h"\n')
-    lines.append("const Entry D[] = {")
+def _iter_table_rows(langs: List[str], data: List[Dict[str, Any]]) -> Iterator[str]:
+    """Yield one '    { "key", "v1", ... },' initializer line per row."""
+    esc = cxx_escape
+    sep = '", "'.join
     for row in data:
-        key = cxx_escape(row["key"])
-        values = [cxx_escape(row.get(ln, "")) for ln in langs]
-        joined = '", "'.join(values)
-        lines.append(f'    {{ "{key}", "{joined}" }},')
-    lines.append("};\n")
-    lines.append('extern "C" {')
-    lines.append("    const Entry* g_i18n_gen_table = D;")
-    lines.append("    const size_t g_i18n_gen_count = sizeof(D) / sizeof(D[0]);")
-    lines.append("}")
-    return "\n".join(lines) + "\n"
-
-def generate_fallback_cpp(langs: List[str], data: List[Dict[str, Any]]) -> str:
-    lines = []
-    lines.append('// Auto-generated fallback table — optional')
-    lines.append('#include "i18n.h"')
-    lines.append("// This file can be used instead of the generated table if desired.\n")
-    lines.append("struct Entry {")
-    lines.append("    const char* key;")
+        get = row.get
+        yield '    { "' + esc(row["key"]) + '", "' + sep([esc(get(ln, "")) for ln in langs]) + '" },\n'
+
+def iter_cpp(langs: List[str], data: List[Dict[str, Any]]) -> Iterator[str]:
+    yield '// Auto-generated from CSV — DO NOT EDIT MANUALLY\n'
+    yield '#include "i18n.h"\n'
+    yield '#include "i18n_gen_export.h"\n\n'
+    yield "const Entry D[] = {\n"
+    yield from _iter_table_rows(langs, data)
+    yield "};\n\n"
+    yield 'extern "C" {\n'
+    yield "    const Entry* g_i18n_gen_table = D;\n"
+    yield "    const size_t g_i18n_gen_count = sizeof(D) / sizeof(D[0]);\n"
+    yield "}\n"
+
+def iter_fallback_cpp(langs: List[str], data: List[Dict[str, Any]]) -> Iterator[str]:
+    yield '// Auto-generated fallback table — optional\n'
+    yield '#include "i18n.h"\n'
+    yield "// This file can be used instead of the generated table if desired.\n\n"
+    yield "struct Entry {\n"
+    yield "    const char* key;\n"
     for ln in langs:
-        lines.append(f"    const char* {ln};")
-    lines.append("};\n")
-    lines.append("static const Entry D_builtin[] = {")
-    for row in data:
-        key = cxx_escape(row["key"])
-        values = [cxx_escape(row.get(ln, "")) for ln in langs]
-        joined = '", "'.join(values)
-        lines.append(f'    {{ "{key}", "{joined}" }},')
-    lines.append("};\n")
-    lines.append("// Implement your own tr() to search D_builtin if you want a built-in table.")
-    return "\n".join(lines) + "\n"
-
-def write_text_file(path: str, content: str):
+        yield f"    const char* {ln};\n"
+    yield "};\n\n"
+    yield "static const Entry D_builtin[] = {\n"
+    yield from _iter_table_rows(langs, data)
+    yield "};\n\n"
+    yield "// Implement your own tr() to search D_builtin if you want a built-in table.\n"
+
+def write_text_file(path: str, content: Union[str, Iterable[str]]):
+    """Write a string or an iterable of chunks (e.g. iter_cpp) to path, backing up any old file."""
     os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
     backup_if_exists(path)
-    with open(path, "w", encoding="utf-8", newline="\n") as f:
-        f.write(content)
+    if isinstance(content, str):
+        content = (content,)
+    with open(path, "w", encoding="utf-8", newline="\n", buffering=1 << 20) as f:
+        f.writelines(content)
 
 def summarize(stats: Dict[str, Any], counters: Dict[str, int] = None):
     print("\n=== Summary ===")
@@ -488,25 +579,21 @@ def main():
             )
             csv_langs, csv_data = merged_langs, merged_rows
 
-    # Generate files (or just summarize)
-    h_text  = generate_header(csv_langs)
-    cpp_text = generate_cpp(csv_langs, csv_data)
-
     summarize(stats, counters)
 
     if args.dry_run:
         print("Dry-run: no files written.")
         return
 
+    # Generate files; the tables are streamed straight to disk
     h_path   = os.path.join(out_dir, "i18n_gen_export.h")
     cpp_path = os.path.join(out_dir, "i18n_gen.cpp")
-    write_text_file(h_path, h_text)
-    write_text_file(cpp_path, cpp_text)
+    write_text_file(h_path, generate_header(csv_langs))
+    write_text_file(cpp_path, iter_cpp(csv_langs, csv_data))
 
     if args.emit_fallback:
-        fb_text = generate_fallback_cpp(csv_langs, csv_data)
         fb_path = os.path.join(out_dir, "i18n_fallback.cpp")
-        write_text_file(fb_path, fb_text)
+        write_text_file(fb_path, iter_fallback_cpp(csv_langs, csv_data))
 
     print("Generated files:")
     print(f"  ✔ {h_path}")
@@ -11,10 +11,12 @@ Supports both:
 Auto-detects number of languages.
 """
 
+import atexit
 import csv
 import os
 import re
 import sys
+from typing import Iterator, List, Tuple
 
 # ────────────────────────────────────────────────────────────
 # Optional GUI
@@ -29,13 +31,24 @@ def _try_import_tk():
 
 TK, FILEDIALOG, MSGBOX = _try_import_tk()
 
+_TK_ROOT = None
+
+def _get_root():
+    """Hidden Tk root shared by all dialogs; created on first use, destroyed at exit."""
+    global _TK_ROOT
+    if _TK_ROOT is None:
+        _TK_ROOT = TK.Tk()
+        _TK_ROOT.withdraw()
+        _TK_ROOT.update_idletasks()
+        atexit.register(_TK_ROOT.destroy)
+    return _TK_ROOT
+
 def browse_open_file(title="Select i18n file", initial=None):
     if TK is None or FILEDIALOG is None:
         return None
-    root = TK.Tk()
-    root.withdraw()
-    root.update_idletasks()
+    root = _get_root()
     path = FILEDIALOG.askopenfilename(
+        parent=root,
         title=title,
         initialdir=initial or os.getcwd(),
         filetypes=[
@@ -43,76 +56,114 @@ def browse_open_file(title="Select i18n file", initial=None):
             ("All files", "*.*")
         ]
     )
-    root.destroy()
     return path or None
 
 def browse_save_file(title="Save translations.csv", initial=None, default_name="translations.csv"):
     if TK is None or FILEDIALOG is None:
         return None
-    root = TK.Tk()
-    root.withdraw()
-    root.update_idletasks()
+    root = _get_root()
     path = FILEDIALOG.asksaveasfilename(
+        parent=root,
         title=title,
         initialdir=initial or os.getcwd(),
         initialfile=default_name,
         defaultextension=".csv",
         filetypes=[("CSV", "*.csv"), ("All files", "*.*")]
     )
-    root.destroy()
     return path or None
 
 # ────────────────────────────────────────────────────────────
 # Parsing engine
 # ────────────────────────────────────────────────────────────
-
-def parse_entries(buf: str):
+_STATIC_TABLE_RE = re.compile(
+    r"(static\s+const\s+Entry\s+D\s*\[\s*\]\s*=\s*\{(.*?)\};)", re.S)
+_TABLE_RE = re.compile(
+    r"(const\s+Entry\s+D\s*\[\s*\]\s*=\s*\{(.*?)\};)", re.S)
+# Fields inside quotes; supports escaped content like \" or \\ or \n
+_QUOTED_FIELD_RE = re.compile(r'"((?:\\.|[^"\\])*)"')
+
+def _iter_rows(block: str) -> Iterator[str]:
     """
-    Extract all { "...", "...", ... } rows from either:
+    Yield the text between each '{' and its closing '}' in an initializer block.
+    Quoted strings are skipped (honouring backslash escapes), so a brace inside
+    a translation does not end the row early.
+    """
+    find = block.find
+    start = find("{")
+    while start != -1:
+        i = start + 1
+        close = find("}", i)
+        while close != -1:
+            quote = find('"', i, close)
+            if quote == -1:
+                break
+            # Skip the string literal; a quote preceded by an odd run of
+            # backslashes is escaped and does not terminate it
+            i = quote + 1
+            while True:
+                q = find('"', i)
+                if q == -1:
+                    return
+                j = q
+                while block[j - 1] == "\\":
+                    j -= 1
+                i = q + 1
+                if (q - j) % 2 == 0:
+                    break
+            if close < i:
+                close = find("}", i)
+        if close == -1:
+            return
+        yield block[start + 1:close]
+        start = find("{", close + 1)
+
+def find_table_block(buf: str) -> str:
+    """
+    Return the body of the initializer block from either:
       static const Entry D[] = { ... };
     or:
       const Entry D[] = { ... };
     """
-    # 1. Find the initializer block
-    block_match = re.search(
-        r"(static\s+const\s+Entry\s+D\s*\[\s*\]\s*=\s*\{(.*?)\};)",
-        buf, re.S)
+    block_match = _STATIC_TABLE_RE.search(buf)
 
     if not block_match:
-        block_match = re.search(
-            r"(const\s+Entry\s+D\s*\[\s*\]\s*=\s*\{(.*?)\};)",
-            buf, re.S)
+        block_match = _TABLE_RE.search(buf)
 
     if not block_match:
         raise RuntimeError(
             "Could not find the Entry D[] = { ... } table in this file."
         )
 
-    block = block_match.group(2)
+    return block_match.group(2)
 
-    # 2. Extract rows: { "key", "en", ... }
-    row_pattern = re.compile(r"\{(.*?)\}", re.S)
-    row_matches = row_pattern.findall(block)
 
-    rows = []
-    max_fields = 0
+def iter_entries(block: str) -> Iterator[List[str]]:
+    """Yield the quoted fields of each { "key", "en", ... } row in block."""
+    for r in _iter_rows(block):
+        fields = _QUOTED_FIELD_RE.findall(r)
+        if fields:
+            yield fields
 
-    for r in row_matches:
-        # Extract fields inside quotes:
-        # supports escaped content like \" or \\ or \n
-        field_pattern = re.compile(r'"((?:\\.|[^"\\])*)"')
-        fields = field_pattern.findall(r)
 
-        if not fields:
-            continue
+def count_entries(block: str) -> Tuple[int, int]:
+    """
+    Cheap first pass over block: returns (row count, max fields per row)
+    without keeping the rows, so the CSV header can be written before streaming.
+    """
+    n_rows = 0
+    max_fields = 0
 
-        rows.append(fields)
-        max_fields = max(max_fields, len(fields))
+    for r in _iter_rows(block):
+        n = sum(1 for _ in _QUOTED_FIELD_RE.finditer(r))
+        if not n:
+            continue
+        n_rows += 1
+        max_fields = max(max_fields, n)
 
-    if not rows:
+    if not n_rows:
         raise RuntimeError("Found D[] table but extracted no translation rows.")
 
-    return rows, max_fields
+    return n_rows, max_fields
 
 
 def write_csv(rows, n_fields, out_path, bom=True):
@@ -155,14 +206,16 @@ def main():
         sys.exit(1)
 
     # Read and parse
-    buf = open(in_path, "r", encoding="utf-8").read()
+    with open(in_path, "r", encoding="utf-8", buffering=1 << 20) as f:
+        buf = f.read()
     try:
-        rows, n_fields = parse_entries(buf)
+        block = find_table_block(buf)
+        n_rows, n_fields = count_entries(block)
     except Exception as e:
         print(f"ERROR: {e}")
         sys.exit(2)
 
-    print(f"Found {len(rows)} rows, each with {n_fields} fields.")
+    print(f"Found {n_rows} rows, each with {n_fields} fields.")
 
     # Where to save?
     default_out = os.path.join(os.path.dirname(os.path.abspath(in_path)),
@@ -177,7 +230,7 @@ def main():
         out_path = default_out
         print(f"No output chosen → using default: {out_path}")
 
-    write_csv(rows, n_fields, out_path, bom=True)
+    write_csv(iter_entries(block), n_fields, out_path, bom=True)
     print(f"\nExport complete: {out_path}\n")
 
 